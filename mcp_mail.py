@@ -13,28 +13,728 @@ import imaplib
 import smtplib
 import email
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.header import decode_header
+from email.header import Header, decode_header
+from email.utils import getaddresses, parseaddr
+from email.parser import BytesParser
+from email.policy import compat32
 import json
 import logging
 import datetime
 import time
+import random
 import sys
 import os
+import re
+import base64
+import quopri
+import itertools
+import functools
+import asyncio
+import copy
+import threading
+import contextlib
+import concurrent.futures
+import sqlite3
 
+try:
+    # 异步接口为可选功能, 需要安装 aioimaplib 和 aiosmtplib
+    import aioimaplib
+    import aiosmtplib
+except ImportError:
+    aioimaplib = None
+    aiosmtplib = None
 
-class MCPMailTool:
-    """MCP邮件工具主类"""
+try:
+    # 可选: 使用 orjson 加快配置文件解析
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# 邮件列表只解析头部字段, 不构建 MIME 结构; 解析器无状态, 可在线程间共用
+_HEADER_PARSER = BytesParser(policy=compat32)
+
+# 已加载的配置文件: 绝对路径 -> (修改时间, 配置)
+_CONFIG_CACHE = {}
+
+
+# FETCH 响应中邮件的起始前缀, 例如 b'12 (BODY[TEXT]<0> {3456}'
+_FETCH_ID_RE = re.compile(rb'(\d+) \(')
+# FETCH 响应中字面量对应的数据项, 例如 b'BODY[HEADER.FIELDS (SUBJECT)] {80}'
+_FETCH_ITEM_RE = re.compile(rb'(?:BODY\[([^\]\s]*)[^\]]*\](?:<\d+>)?|(RFC822)) \{\d+\}$')
+# FETCH 响应中的 UID 数据项, 例如 b'12 (UID 3456 ...' 或 b' UID 3456)'
+_FETCH_UID_RE = re.compile(rb'[ (]UID (\d+)')
+# SELECT 响应中的 UIDVALIDITY, 例如 b'OK [UIDVALIDITY 3857529045] UIDs valid'
+_UIDVALIDITY_RE = re.compile(rb'\[UIDVALIDITY (\d+)\]')
+# SELECT 响应中的邮件数量, 例如 b'172 EXISTS'
+_EXISTS_RE = re.compile(rb'^(\d+) EXISTS')
+# 响应行末尾的字面量长度标记, 例如 b'{12}'
+_LITERAL_SIZE_RE = re.compile(rb'\{\d+\}$')
+# IMAP 原子 (数字、NIL、未加引号的关键字等)
+_IMAP_ATOM_RE = re.compile(rb'[^\s()"]+')
+# 收件人邮箱格式: 一个 @, 域名中至少一个点, 不含空白
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+# HTML 标签 (简单处理)
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+# 摘要中将换行替换为空格
+_NEWLINES_TO_SPACES = str.maketrans('\r\n', '  ')
+
+# 邮件列表只需要的头部字段
+_SUMMARY_HEADERS = 'SUBJECT FROM DATE'
+# 正文预览的最大字节数, 足以生成正文摘要
+_PREVIEW_SIZE = 4096
+# 邮件列表缓存的默认位置
+_DEFAULT_HEADER_CACHE = os.path.join('~', '.cache', 'mcp_mail', 'headers.db')
+
+# 邮件结构、列表头部字段和第 1 部分正文的开头; BODY.PEEK 不会设置 \Seen 标记
+_SUMMARY_FETCH_ITEMS = (
+    f'(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({_SUMMARY_HEADERS})] '
+    f'BODY.PEEK[1]<0.{_PREVIEW_SIZE}>)'
+)
+
+
+def _compact_message_set(ids):
+    """将邮件序号列表压缩为 IMAP 消息集合
+
+    连续的序号合并为区间, 例如 [1, 2, 3, 7] -> b'1:3,7'
+
+    Args:
+        ids (list): 邮件序号列表 (bytes 或 int)
+
+    Returns:
+        bytes: IMAP 消息集合
+    """
+    numbers = sorted(int(i) for i in ids)
+    ranges = []
+    start = prev = numbers[0]
+    for n in numbers[1:]:
+        if n == prev + 1:
+            prev = n
+            continue
+        ranges.append((start, prev))
+        start = prev = n
+    ranges.append((start, prev))
+    return b','.join(
+        b'%d' % lo if lo == hi else b'%d:%d' % (lo, hi) for lo, hi in ranges
+    )
+
+
+def _parse_fetch_response(msg_data, by_uid=False):
+    """解析 FETCH 响应
+
+    字面量数据 (BODY[...]、RFC822) 按数据项名称保存; UID 和
+    BODYSTRUCTURE 从响应的其余文本中解析。
+
+    Args:
+        msg_data (list): imaplib 返回的 FETCH 响应数据
+        by_uid (bool): 是否以 UID 而不是邮件序号作为键
+
+    Returns:
+        dict: 邮件序号或 UID (bytes) -> {数据项名称: 数据}, 数据项名称如
+            b'HEADER.FIELDS'、b'1'、b'RFC822'、b'UID'、b'BODYSTRUCTURE'
+    """
+    messages = {}
+    texts = {}
+    sections = None
+    for item in msg_data:
+        if isinstance(item, tuple):
+            prefix, data = item
+        elif isinstance(item, bytes):
+            prefix, data = item, None
+        else:
+            continue
+        match = _FETCH_ID_RE.match(prefix)
+        if match:
+            sections = messages.setdefault(match.group(1), {})
+            text = texts.setdefault(match.group(1), [])
+        if sections is None:
+            continue
+        
+        match = _FETCH_ITEM_RE.search(prefix)
+        if data is None:
+            text.append(prefix)
+        elif match:
+            sections[match.group(1) or match.group(2)] = data
+            text.append(prefix[:match.start()])
+        else:
+            # 结构数据中的字面量 (如 BODYSTRUCTURE 中的文件名), 转为带引号的字符串
+            quoted = data.replace(b'\\', b'\\\\').replace(b'"', b'\\"')
+            text.append(_LITERAL_SIZE_RE.sub(b'', prefix) + b'"' + quoted + b'"')
+    
+    for msg_id, sections in messages.items():
+        text = b''.join(texts[msg_id])
+        match = _FETCH_UID_RE.search(text)
+        if match:
+            sections[b'UID'] = match.group(1)
+        pos = text.find(b'BODYSTRUCTURE ')
+        if pos >= 0:
+            try:
+                sections[b'BODYSTRUCTURE'] = _parse_imap_value(text, pos + len(b'BODYSTRUCTURE '))[0]
+            except ValueError:
+                pass
+    
+    if by_uid:
+        return {
+            sections[b'UID']: sections
+            for sections in messages.values() if b'UID' in sections
+        }
+    return messages
+
+
+def _uids_newest_first(msg_data, seqs):
+    """从 FETCH (UID) 响应中按邮件序号倒序取出 UID
+
+    Args:
+        msg_data (list): imaplib 格式的 FETCH 响应数据
+        seqs (range): 请求的邮件序号范围
+
+    Returns:
+        list: UID 列表 (bytes), 最新的邮件在前
+    """
+    messages = _parse_fetch_response(msg_data)
+    latest_ids = []
+    for seq in reversed(seqs):
+        sections = messages.get(b'%d' % seq)
+        if sections and b'UID' in sections:
+            latest_ids.append(sections[b'UID'])
+    return latest_ids
+
+
+def _merge_fetched(target, source):
+    """将补充获取的数据合并到已有的 FETCH 结果中"""
+    for msg_id, sections in source.items():
+        target.setdefault(msg_id, {}).update(sections)
+
+
+def _parse_imap_value(data, pos=0):
+    """解析 IMAP 响应中的一个值
+
+    Args:
+        data (bytes): 响应文本
+        pos (int): 起始位置
+
+    Returns:
+        tuple: (值, 结束位置); 括号列表为 list, 字符串和原子为 bytes, NIL 为 None
+
+    Raises:
+        ValueError: 响应格式无效
+    """
+    while data[pos:pos + 1] == b' ':
+        pos += 1
+    char = data[pos:pos + 1]
+    
+    if char == b'(':
+        items = []
+        pos += 1
+        while True:
+            while data[pos:pos + 1] == b' ':
+                pos += 1
+            if pos >= len(data):
+                raise ValueError("括号列表未结束")
+            if data[pos:pos + 1] == b')':
+                return items, pos + 1
+            value, pos = _parse_imap_value(data, pos)
+            items.append(value)
+    
+    if char == b'"':
+        value = bytearray()
+        pos += 1
+        while pos < len(data):
+            byte = data[pos]
+            if byte == 0x5c:  # 反斜杠转义
+                value += data[pos + 1:pos + 2]
+                pos += 2
+            elif byte == 0x22:  # 结束引号
+                return bytes(value), pos + 1
+            else:
+                value.append(byte)
+                pos += 1
+        raise ValueError("字符串未结束")
+    
+    match = _IMAP_ATOM_RE.match(data, pos)
+    if not match:
+        raise ValueError(f"无效的 IMAP 数据: {data[pos:pos + 20]!r}")
+    atom = match.group(0)
+    return (None if atom.upper() == b'NIL' else atom), match.end()
+
+
+def _part_encoding(part):
+    """读取 BODYSTRUCTURE 中单个部分的传输编码和字符集
+
+    Args:
+        part (list): 非 multipart 部分的 BODYSTRUCTURE
+
+    Returns:
+        tuple: (传输编码, 字符集), 均为小写字符串
+    """
+    params = part[2] if isinstance(part[2], list) else []
+    charset = 'utf-8'
+    for name, value in zip(params[::2], params[1::2]):
+        if name and value and name.lower() == b'charset':
+            charset = value.decode('ascii', errors='ignore').lower()
+    encoding = (part[5] or b'7bit').decode('ascii', errors='ignore').lower()
+    return encoding, charset
+
+
+def _find_text_part(structure, prefix=b''):
+    """根据 BODYSTRUCTURE 找出用于正文摘要的部分
+
+    非 multipart 邮件使用正文本身 (第 1 部分); multipart 邮件使用深度
+    优先遍历遇到的第一个 text/plain 部分, 与 extract_body_summary 一致。
+
+    Args:
+        structure (list): BODYSTRUCTURE
+        prefix (bytes): 所在 multipart 的段号前缀
+
+    Returns:
+        tuple: (段号, 传输编码, 字符集), 没有纯文本部分时返回 None
+    """
+    if not (structure and isinstance(structure[0], list)):
+        return (b'1',) + _part_encoding(structure)
+    
+    # multipart 的子部分是开头连续的列表, 其后为子类型和扩展数据
+    children = itertools.takewhile(lambda child: isinstance(child, list), structure)
+    for index, child in enumerate(children, 1):
+        section = prefix + b'%d' % index
+        if child and isinstance(child[0], list):
+            found = _find_text_part(child, section + b'.')
+            if found:
+                return found
+        elif (child[0] or b'').lower() == b'text' and (child[1] or b'').lower() == b'plain':
+            return (section,) + _part_encoding(child)
+    return None
+
+
+def _decode_transfer(data, encoding):
+    """按传输编码解码正文片段
+
+    片段可能在任意位置被截断, base64 只解码完整的 4 字符组。
+
+    Args:
+        data (bytes): 正文片段
+        encoding (str): 传输编码
+
+    Returns:
+        bytes: 解码后的数据
+    """
+    if encoding == 'base64':
+        data = b''.join(data.split())
+        return base64.b64decode(data[:len(data) - len(data) % 4])
+    if encoding == 'quoted-printable':
+        return quopri.decodestring(data)
+    return data
+
+
+def _summarize_text(body, max_length):
+    """清理并截断正文, 生成摘要
+
+    Args:
+        body (str): 正文
+        max_length (int): 摘要最大长度
+
+    Returns:
+        str: 正文摘要
+    """
+    body = body.strip()
+    # 先截断再替换换行, 不处理被丢弃的部分
+    if len(body) > max_length:
+        return body[:max_length].translate(_NEWLINES_TO_SPACES) + "..."
+    return body.translate(_NEWLINES_TO_SPACES) or "无正文内容"
+
+
+@functools.lru_cache(maxsize=4096)
+def _decode_mime_words(s):
+    """解码 MIME 编码字 (=?charset?b?...?=)
+
+    同一发件人、主题会反复出现, 结果按原始字符串缓存。
+
+    Args:
+        s (str): 待解码字符串
+
+    Returns:
+        str: 解码后的字符串
+    """
+    fragments = []
+    for fragment, encoding in decode_header(s):
+        if isinstance(fragment, bytes):
+            fragment = fragment.decode(encoding or 'utf-8', errors='strict' if encoding else 'ignore')
+        fragments.append(fragment)
+    return ''.join(fragments)
+
+
+def _aioimaplib_to_imaplib(lines):
+    """将 aioimaplib 的 FETCH 响应行转换为 imaplib 的数据格式
+
+    aioimaplib 返回 [b'1 FETCH (... {n}', bytearray(...), b')', ...],
+    转换为 imaplib 的 [(b'1 (... {n}', b'...'), b')', ...]
+
+    Args:
+        lines (list): aioimaplib 响应行
+
+    Returns:
+        list: imaplib 格式的 FETCH 响应数据
+    """
+    msg_data = []
+    i = 0
+    while i < len(lines):
+        line = re.sub(rb'^(\d+) FETCH ', rb'\1 ', bytes(lines[i]))
+        if line.endswith(b'}') and i + 1 < len(lines) and isinstance(lines[i + 1], bytearray):
+            msg_data.append((line, bytes(lines[i + 1])))
+            i += 2
+        else:
+            msg_data.append(line)
+            i += 1
+    return msg_data
+
+
+class PipelinedIMAP4_SSL(imaplib.IMAP4_SSL):
+    """支持 FETCH 命令流水线的 IMAP4_SSL 连接
+
+    按 RFC 3501 5.5 节, 连续发送多条 FETCH 命令后再依次读取各自的
+    标记响应, 省去每条命令之间的往返等待。SELECT/LOGIN 等改变状态的
+    命令仍按原方式逐条执行, 不参与流水线。
+
+    连接还记录当前选中的文件夹, 重复选择同一文件夹时不再发送 SELECT。
+    """
+
+    # 当前选中的 (文件夹, 是否只读), 未选中时为 None
+    selected_mailbox = None
+    # 当前文件夹的 UIDVALIDITY 和邮件数量 (bytes)
+    uidvalidity = None
+    exists = None
+
+    def select_cached(self, mailbox='INBOX', readonly=False):
+        """选择文件夹, 已选中同一文件夹时直接返回记录的邮件数量
+
+        新邮件通过之前命令 (如连接池复用前的 NOOP) 附带的 EXISTS 响应
+        更新数量; 收到 EXPUNGE 时邮件序号已变化, 重新发送 SELECT。
+        只读请求也可以复用以读写方式选中的同一文件夹。
+
+        Args:
+            mailbox (str): 文件夹名称
+            readonly (bool): 是否以只读方式 (EXAMINE) 打开
+
+        Returns:
+            tuple: 与 select() 相同的 (状态, [邮件数量])
+        """
+        expunged = self.untagged_responses.pop('EXPUNGE', None)
+        exists = self.untagged_responses.pop('EXISTS', None)
+        if (self.state == 'SELECTED' and not expunged and self.selected_mailbox
+                and self.selected_mailbox[0] == mailbox
+                and (readonly or not self.selected_mailbox[1])):
+            if exists:
+                self.exists = exists[-1]
+            return 'OK', [self.exists]
+
+        typ, dat = self.select(mailbox, readonly)
+        if typ == 'OK':
+            self.selected_mailbox = (mailbox, readonly)
+            self.uidvalidity = self.untagged_responses.get('UIDVALIDITY', [None])[-1]
+            self.exists = dat[-1]
+        else:
+            self.selected_mailbox = None
+        return typ, dat
+
+    def fetch_pipelined(self, commands, uid=False):
+        """流水线方式获取多组邮件
+
+        Args:
+            commands (list): [(IMAP 消息集合 (bytes), FETCH 数据项), ...]
+            uid (bool): 消息集合是否为 UID (使用 UID FETCH)
+
+        Returns:
+            tuple: (每条命令的状态列表, 合并后的 FETCH 响应数据)
+        """
+        name = 'UID' if uid else 'FETCH'
+        prefix = ('FETCH',) if uid else ()
+        tags = [self._command(name, *prefix, message_set, message_parts)
+                for message_set, message_parts in commands]
+
+        # FETCH 响应是无标记的, 按邮件序号区分, 这里只需按标记等待完成
+        statuses = []
+        error = None
+        for tag in tags:
+            try:
+                typ, dat = self._command_complete(name, tag)
+            except self.error as e:
+                # 继续读取其余命令的响应, 避免连接状态错乱
+                error = error or e
+                typ = 'BAD'
+            statuses.append(typ)
+        if error:
+            raise error
+
+        typ, dat = self._untagged_response('OK', [None], 'FETCH')
+        return statuses, dat
+
+
+class ConnectionPool:
+    """IMAP/SMTP 连接池
+
+    按 (协议, 服务器, 端口, 用户) 保存已登录的空闲连接, 后进先出复用,
+    省去重复的 TLS 握手和登录。后台线程关闭空闲超过 idle_timeout 秒的
+    连接; idle_timeout 为 None 时不自动关闭。
+    """
+
+    def __init__(self, idle_timeout=100):
+        """初始化连接池
+
+        Args:
+            idle_timeout (float): 空闲连接的最长保留时间 (秒)
+        """
+        self.idle_timeout = idle_timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._reaper = None
+
+    def get(self, key):
+        """取出最近放回的空闲连接
+
+        Args:
+            key (tuple): 连接标识
+
+        Returns:
+            连接对象, 没有空闲连接时返回 None
+        """
+        with self._lock:
+            stack = self._idle.get(key)
+            if stack:
+                return stack.pop()[0]
+        return None
+
+    def put(self, key, conn, closer):
+        """放回空闲连接
+
+        Args:
+            key (tuple): 连接标识
+            conn: 连接对象
+            closer (callable): 关闭该连接的函数
+        """
+        with self._lock:
+            self._idle.setdefault(key, []).append((conn, closer, time.monotonic()))
+            if self.idle_timeout is not None and self._reaper is None:
+                self._closed.clear()
+                self._reaper = threading.Thread(target=self._reap_loop, daemon=True)
+                self._reaper.start()
+
+    def _reap_loop(self):
+        """定期关闭空闲超时的连接"""
+        interval = max(1, self.idle_timeout / 4)
+        while not self._closed.wait(interval):
+            deadline = time.monotonic() - self.idle_timeout
+            expired = []
+            with self._lock:
+                for key, stack in self._idle.items():
+                    expired.extend(item for item in stack if item[2] < deadline)
+                    stack[:] = [item for item in stack if item[2] >= deadline]
+            for conn, closer, _ in expired:
+                _close_quietly(closer, conn)
+
+    def keepalive(self, key, alive, closer):
+        """检查并刷新空闲连接, 关闭已失效的连接
+
+        Args:
+            key (tuple): 连接标识
+            alive (callable): 检查连接是否可用的函数, 通常发送 NOOP
+            closer (callable): 关闭连接的函数
+        """
+        with self._lock:
+            stack = self._idle.pop(key, [])
+        for conn, conn_closer, _ in stack:
+            if alive(conn):
+                self.put(key, conn, conn_closer)
+            else:
+                _close_quietly(closer, conn)
+
+    def close_all(self):
+        """关闭所有空闲连接并停止后台线程"""
+        with self._lock:
+            items = [item for stack in self._idle.values() for item in stack]
+            self._idle.clear()
+            self._reaper = None
+            self._closed.set()
+        for conn, closer, _ in items:
+            _close_quietly(closer, conn)
+
+
+# 连接层面的错误, 出现后连接不再可用 (ssl.SSLError、socket.timeout 均为 OSError)
+_IMAP_CONNECTION_ERRORS = (imaplib.IMAP4.abort, OSError)
+_SMTP_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, OSError)
+# 值得重试的错误: 连接中断、超时, 以及建立连接时的网络错误。
+# IMAP_CONNECTION_FAILED 是服务器对 LOGIN 的 NO/BAD 应答 (如 Outlook 的
+# "LOGIN failed."), 实为认证被拒, 重试只会增加账户被锁的风险, 不在此列
+_RETRYABLE_ERRORS = _IMAP_CONNECTION_ERRORS + _SMTP_CONNECTION_ERRORS + (asyncio.TimeoutError,)
+if aioimaplib is not None:
+    _RETRYABLE_ERRORS += (aioimaplib.Abort, aioimaplib.CommandTimeout)
+_RETRYABLE_CODES = ('NETWORK_ERROR', 'SMTP_CONNECTION_FAILED')
+
+
+def _is_retryable(error):
+    """判断操作失败后是否值得重试
+
+    只重试网络和连接层面的错误; 认证失败、文件夹或邮件不存在、参数
+    错误等重试也不会成功, 直接返回失败。
+    """
+    return isinstance(error, _RETRYABLE_ERRORS) or str(error).startswith(_RETRYABLE_CODES)
+
+
+def _close_quietly(closer, conn):
+    """关闭连接, 忽略关闭过程中的错误"""
+    try:
+        closer(conn)
+    except Exception:
+        pass
+
+
+def _imap_alive(conn):
+    """发送 NOOP 检查 IMAP 连接是否可用"""
+    try:
+        return conn.noop()[0] == 'OK'
+    except Exception:
+        return False
+
+
+def _smtp_alive(conn):
+    """发送 NOOP 检查 SMTP 连接是否可用"""
+    try:
+        return conn.noop()[0] == 250
+    except Exception:
+        return False
+
+
+def _logout_imap(conn):
+    """关闭 IMAP 连接"""
+    try:
+        if conn.state == 'SELECTED':
+            conn.close()
+    finally:
+        conn.logout()
+
+
+def _quit_smtp(conn):
+    """关闭 SMTP 连接"""
+    conn.quit()
+
+
+class HeaderCache:
+    """邮件列表信息的本地缓存 (SQLite)
+
+    以 (账户, 文件夹, UIDVALIDITY, UID) 为键保存已解析的主题、发件人、
+    日期和正文摘要。同一 UID 的邮件内容不会改变, UIDVALIDITY 变化时
+    丢弃该文件夹的旧缓存。
+    """
+
+    # SQLite 单条语句的参数个数上限较小, 按批查询
+    _QUERY_BATCH = 500
+
+    def __init__(self, path):
+        """打开或创建缓存数据库
+
+        缓存包含邮件主题、发件人和正文摘要, 目录和数据库文件只允许
+        当前用户访问 (0700/0600)。
+
+        Args:
+            path (str): 数据库文件路径
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        # 先以 0600 创建文件, SQLite 的 WAL/SHM 文件沿用数据库文件的权限
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+        os.chmod(path, 0o600)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS headers ('
+            ' account TEXT, folder TEXT, uidvalidity INTEGER, uid INTEGER,'
+            ' subject TEXT, sender TEXT, date TEXT, body_summary TEXT,'
+            ' PRIMARY KEY (account, folder, uidvalidity, uid))'
+        )
+
+    def get(self, account, folder, uidvalidity, uids):
+        """查询已缓存的邮件
+
+        Args:
+            account (str): 邮箱账户
+            folder (str): 邮件文件夹名称
+            uidvalidity (int): 文件夹的 UIDVALIDITY
+            uids (list): UID 列表 (bytes)
+
+        Returns:
+            dict: UID (bytes) -> 邮件信息
+        """
+        found = {}
+        uids = [int(uid) for uid in uids]
+        with self._lock:
+            for start in range(0, len(uids), self._QUERY_BATCH):
+                batch = uids[start:start + self._QUERY_BATCH]
+                rows = self._db.execute(
+                    'SELECT uid, subject, sender, date, body_summary FROM headers'
+                    ' WHERE account = ? AND folder = ? AND uidvalidity = ?'
+                    f' AND uid IN ({",".join("?" * len(batch))})',
+                    [account, folder, uidvalidity] + batch
+                )
+                for uid, subject, sender, date, body_summary in rows:
+                    found[b'%d' % uid] = {
+                        "id": str(uid),
+                        "subject": subject,
+                        "sender": sender,
+                        "date": date,
+                        "body_summary": body_summary
+                    }
+        return found
+
+    def put(self, account, folder, uidvalidity, emails):
+        """写入新获取的邮件, 并清理 UIDVALIDITY 已失效的旧缓存
+
+        Args:
+            account (str): 邮箱账户
+            folder (str): 邮件文件夹名称
+            uidvalidity (int): 文件夹的 UIDVALIDITY
+            emails (list): 邮件信息列表
+        """
+        rows = [
+            (account, folder, uidvalidity, int(e['id']),
+             e['subject'], e['sender'], e['date'], e['body_summary'])
+            for e in emails
+        ]
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.execute(
+                    'DELETE FROM headers WHERE account = ? AND folder = ? AND uidvalidity != ?',
+                    (account, folder, uidvalidity)
+                )
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO headers VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows
+                )
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._db.close()
+
+
+class _MailToolBase:
+    """同步与异步邮件工具的共用部分
+
+    包括配置加载、邮件列表缓存, 以及不涉及网络连接的邮件解析和构建。
+    """
     
     def __init__(self, config_file="config.json"):
-        """初始化邮件工具
+        """初始化配置、日志和邮件列表缓存
         
         Args:
             config_file (str): 配置文件路径
         """
         self.config = self.load_config(config_file)
-        self.imap_conn = None
-        self.smtp_conn = None
         
         # 设置日志
         logging.basicConfig(
@@ -42,6 +742,48 @@ class MCPMailTool:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         self.logger = logging.getLogger(__name__)
+        
+        # 邮件列表缓存在第一次 mail_read 时才打开, 发送和获取详情不需要它
+        self._cache = None
+        self._cache_opened = False
+        self._cache_lock = threading.Lock()
+    
+    def _header_cache(self):
+        """返回邮件列表缓存, 首次调用时打开
+        
+        Returns:
+            HeaderCache: 缓存对象, 禁用或打开失败时返回 None
+        """
+        with self._cache_lock:
+            if not self._cache_opened:
+                self._cache = self._open_header_cache()
+                self._cache_opened = True
+            return self._cache
+    
+    def _close_header_cache(self):
+        """关闭邮件列表缓存, 之后的 mail_read 会重新打开"""
+        with self._cache_lock:
+            if self._cache is not None:
+                self._cache.close()
+            self._cache = None
+            self._cache_opened = False
+    
+    def _open_header_cache(self):
+        """打开邮件列表缓存
+        
+        配置项 header_cache 为缓存文件路径, 设为 false 时禁用缓存。
+        
+        Returns:
+            HeaderCache: 缓存对象, 禁用或打开失败时返回 None
+        """
+        path = self.config.get('header_cache', _DEFAULT_HEADER_CACHE)
+        if not path:
+            return None
+        try:
+            return HeaderCache(os.path.expanduser(path))
+        except Exception as e:
+            self.logger.warning(f"无法打开邮件缓存, 已禁用缓存: {str(e)}")
+            return None
     
     def load_config(self, config_file):
         """加载配置文件
@@ -56,220 +798,1024 @@ class MCPMailTool:
             Exception: 配置文件加载失败
         """
         try:
-            if not os.path.exists(config_file):
-                raise FileNotFoundError(f"配置文件不存在: {config_file}")
+            with open(config_file, 'rb') as f:
+                # 文件未修改时复用已解析的配置
+                path = os.path.abspath(config_file)
+                mtime = os.fstat(f.fileno()).st_mtime_ns
+                cached = _CONFIG_CACHE.get(path)
+                if cached and cached[0] == mtime:
+                    return dict(cached[1])
                 
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+                config = _json_loads(f.read())
                 
             # 验证必需的配置项
             required_fields = ['email', 'password', 'imap_server', 'smtp_server']
             for field in required_fields:
                 if field not in config:
                     raise ValueError(f"配置文件缺少必需字段: {field}")
-                    
-            return config
             
-        except Exception as e:
-            raise Exception(f"CONFIGURATION_ERROR: {str(e)}")
+            _CONFIG_CACHE[path] = (mtime, config)
+            return dict(config)
+            
+        except FileNotFoundError:
+            raise Exception(f"CONFIGURATION_ERROR: 配置文件不存在: {config_file}")
+        except Exception as e:
+            raise Exception(f"CONFIGURATION_ERROR: {str(e)}")
+    
+    def decode_mime_words(self, s):
+        """解码MIME编码的字符串
+        
+        Args:
+            s (str): 待解码字符串
+            
+        Returns:
+            str: 解码后的字符串
+        """
+        try:
+            if not isinstance(s, str):
+                # 含原始 8 位字节的头部以 Header 对象返回, 不可哈希, 不走缓存
+                return _decode_mime_words.__wrapped__(s)
+            if '=?' not in s:
+                # 没有编码字时 decode_header 原样返回
+                return s
+            return _decode_mime_words(s)
+        except Exception as e:
+            self.logger.warning(f"解码失败: {str(e)}")
+            return str(s)
+    
+    def _retry_delay(self, attempt):
+        """计算第 attempt 次失败后的重试等待时间 (秒)"""
+        return self.config.get('retry_delay', 2) * (2 ** attempt) * (0.5 + random.random())
+    
+    def _cache_get(self, folder, uidvalidity, uids):
+        """从邮件列表缓存中读取邮件信息
+        
+        Args:
+            folder (str): 邮件文件夹名称
+            uidvalidity (bytes): 文件夹的 UIDVALIDITY, 未知时为 None
+            uids (list): UID 列表 (bytes)
+            
+        Returns:
+            dict: UID (bytes) -> 邮件信息
+        """
+        cache = self._header_cache() if uidvalidity is not None else None
+        if cache is None:
+            return {}
+        try:
+            return cache.get(self.config['email'], folder, int(uidvalidity), uids)
+        except Exception as e:
+            self.logger.warning(f"读取邮件缓存失败: {str(e)}")
+            return {}
+    
+    def _cache_put(self, folder, uidvalidity, emails):
+        """将邮件信息写入邮件列表缓存
+        
+        Args:
+            folder (str): 邮件文件夹名称
+            uidvalidity (bytes): 文件夹的 UIDVALIDITY, 未知时为 None
+            emails (list): 邮件信息列表
+        """
+        cache = self._header_cache() if uidvalidity is not None and emails else None
+        if cache is None:
+            return
+        try:
+            cache.put(self.config['email'], folder, int(uidvalidity), emails)
+        except Exception as e:
+            self.logger.warning(f"写入邮件缓存失败: {str(e)}")
+    
+    def _plan_text_parts(self, fetched):
+        """根据 BODYSTRUCTURE 确定各邮件用于摘要的正文部分
+        
+        第 1 部分已随列表一起获取; 其他部分 (例如 multipart/mixed 中嵌套的
+        text/plain) 按段号补充获取。没有可用结构的邮件回退为获取完整邮件。
+        
+        Args:
+            fetched (dict): UID -> {数据项名称: 数据}
+            
+        Returns:
+            tuple: (UID -> (段号, 传输编码, 字符集) 或 None,
+                需要补充获取的 [(UID 列表, FETCH 数据项), ...])
+        """
+        text_parts = {}
+        by_section = {}
+        full_ids = []
+        for msg_id, sections in fetched.items():
+            structure = sections.get(b'BODYSTRUCTURE')
+            if not structure:
+                full_ids.append(msg_id)
+                continue
+            try:
+                part = _find_text_part(structure)
+            except Exception as e:
+                self.logger.warning(f"解析邮件 {msg_id} 结构时出错: {str(e)}")
+                full_ids.append(msg_id)
+                continue
+            text_parts[msg_id] = part
+            if part and part[0] not in sections:
+                by_section.setdefault(part[0], []).append(msg_id)
+        
+        requests = [
+            (msg_ids, f'(UID BODY.PEEK[{section.decode()}]<0.{_PREVIEW_SIZE}>)')
+            for section, msg_ids in by_section.items()
+        ]
+        if full_ids:
+            requests.append((full_ids, '(UID RFC822)'))
+        return text_parts, requests
+    
+    def _build_email_list(self, message_ids, fetched, text_parts):
+        """按给定顺序生成邮件列表
+        
+        Args:
+            message_ids (list): UID 列表 (bytes)
+            fetched (dict): UID -> {数据项名称: 数据}
+            text_parts (dict): UID -> (段号, 传输编码, 字符集) 或 None
+            
+        Returns:
+            list: 邮件信息列表
+        """
+        emails = []
+        for msg_id in message_ids:
+            sections = fetched.get(msg_id)
+            if not sections:
+                continue
+            
+            try:
+                if b'RFC822' in sections:
+                    email_message = email.message_from_bytes(sections[b'RFC822'])
+                    body_summary = self.extract_body_summary(email_message)
+                else:
+                    email_message = _HEADER_PARSER.parsebytes(
+                        sections.get(b'HEADER.FIELDS', b''), headersonly=True
+                    )
+                    body_summary = self._summarize_part(sections, text_parts.get(msg_id))
+                
+                # 提取邮件信息
+                subject = self.decode_mime_words(email_message['Subject'] or "无主题")
+                sender = self.decode_mime_words(email_message['From'] or "未知发件人")
+                date = email_message['Date'] or "未知时间"
+                
+                emails.append({
+                    "id": msg_id.decode(),
+                    "subject": subject,
+                    "sender": sender,
+                    "date": date,
+                    "body_summary": body_summary
+                })
+                
+            except Exception as e:
+                self.logger.warning(f"处理邮件 {msg_id} 时出错: {str(e)}")
+                continue
+        return emails
+    
+    def _summarize_part(self, sections, part, max_length=200):
+        """根据获取到的正文片段生成摘要
+        
+        Args:
+            sections (dict): {数据项名称: 数据}
+            part (tuple): (段号, 传输编码, 字符集), 没有纯文本部分时为 None
+            max_length (int): 摘要最大长度
+            
+        Returns:
+            str: 邮件正文摘要
+        """
+        if part is None:
+            return "无正文内容"
+        section, encoding, charset = part
+        try:
+            payload = _decode_transfer(sections.get(section, b''), encoding)
+            return _summarize_text(payload.decode(charset, errors='ignore'), max_length)
+        except Exception as e:
+            self.logger.warning(f"提取正文摘要失败: {str(e)}")
+            return "正文解析失败"
+    
+    def extract_body_summary(self, email_message, max_length=200):
+        """提取邮件正文摘要
+        
+        Args:
+            email_message: 邮件消息对象
+            max_length (int): 摘要最大长度
+            
+        Returns:
+            str: 邮件正文摘要
+        """
+        try:
+            part = email_message
+            if email_message.is_multipart():
+                part = next((p for p in email_message.walk()
+                             if p.get_content_type() == "text/plain"), None)
+                if part is None:
+                    return "无正文内容"
+            
+            charset = part.get_content_charset() or 'utf-8'
+            encoding = (part['Content-Transfer-Encoding'] or '7bit').strip().lower()
+            payload = part.get_payload()
+            if encoding in ('base64', 'quoted-printable') and payload.isascii():
+                # 只解码正文开头, 摘要不需要整体解码大邮件
+                head = _decode_transfer(payload[:_PREVIEW_SIZE].encode('ascii'), encoding)
+            else:
+                # 7bit/8bit 正文的原始字节需按字符集解码, 交给 email 包处理
+                head = part.get_payload(decode=True) or b''
+            body = head.decode(charset, errors='ignore')
+            
+            # 清理和截断正文
+            return _summarize_text(body, max_length)
+            
+        except Exception as e:
+            self.logger.warning(f"提取正文摘要失败: {str(e)}")
+            return "正文解析失败"
+    
+    def _is_valid_email(self, address):
+        """检查收件人邮箱格式
+        
+        Args:
+            address (str): 邮箱地址
+            
+        Returns:
+            bool: 格式是否有效
+        """
+        # 允许 "姓名 <地址>" 形式, 只校验其中的地址部分;
+        # 只接受单个收件人, "a@b.com, c@d.com" 这类多地址输入直接拒绝
+        addresses = getaddresses([address])
+        return len(addresses) == 1 and bool(_EMAIL_RE.match(addresses[0][1]))
+    
+    def _build_message(self, to, subject, body):
+        """创建纯文本邮件
+        
+        Args:
+            to (str): 收件人邮箱
+            subject (str): 邮件主题
+            body (str): 邮件正文
+            
+        Returns:
+            邮件消息对象
+        """
+        # 只有纯文本正文, 不需要 multipart 容器
+        msg = MIMEText(body, 'plain', 'utf-8')
+        msg['From'] = self.config['email']
+        msg['To'] = to
+        msg['Subject'] = Header(subject, 'utf-8')
+        return msg
+    
+    def _build_email_detail(self, email_id, email_body):
+        """解析完整邮件, 生成邮件详情
+        
+        Args:
+            email_id (str): 邮件ID
+            email_body (bytes): RFC822 邮件内容
+            
+        Returns:
+            dict: 邮件详细信息
+        """
+        email_message = email.message_from_bytes(email_body)
+        
+        # 提取完整邮件信息
+        subject = self.decode_mime_words(email_message['Subject'] or "无主题")
+        sender = self.decode_mime_words(email_message['From'] or "未知发件人")
+        to = self.decode_mime_words(email_message['To'] or "未知收件人")
+        date = email_message['Date'] or "未知时间"
+        
+        # 提取完整正文
+        body = self.extract_full_body(email_message)
+        
+        return {
+            "success": True,
+            "id": email_id,
+            "subject": subject,
+            "sender": sender,
+            "to": to,
+            "date": date,
+            "body": body
+        }
+    
+    def extract_full_body(self, email_message):
+        """提取邮件完整正文
+        
+        Args:
+            email_message: 邮件消息对象
+            
+        Returns:
+            str: 邮件完整正文
+        """
+        try:
+            body = ""
+            
+            if email_message.is_multipart():
+                for part in email_message.walk():
+                    if part.get_content_type() == "text/plain":
+                        charset = part.get_content_charset() or 'utf-8'
+                        body = part.get_payload(decode=True).decode(charset, errors='ignore')
+                        break
+                    elif part.get_content_type() == "text/html" and not body:
+                        # 如果没有纯文本，使用HTML（简单处理）
+                        charset = part.get_content_charset() or 'utf-8'
+                        html_body = part.get_payload(decode=True).decode(charset, errors='ignore')
+                        # 简单的HTML标签移除, 须在解码后进行 (UTF-16、ISO-2022-JP 的字节中也会出现 < >)
+                        body = _HTML_TAG_RE.sub('', html_body)
+            else:
+                charset = email_message.get_content_charset() or 'utf-8'
+                body = email_message.get_payload(decode=True).decode(charset, errors='ignore')
+            
+            return body.strip() or "无正文内容"
+            
+        except Exception as e:
+            self.logger.warning(f"提取完整正文失败: {str(e)}")
+            return "正文解析失败"
+
+
+class MCPMailTool(_MailToolBase):
+    """MCP邮件工具主类"""
+    
+    def __init__(self, config_file="config.json", pool=None):
+        """初始化邮件工具
+        
+        Args:
+            config_file (str): 配置文件路径
+            pool (ConnectionPool): 连接池, 默认为每个实例新建
+        """
+        super().__init__(config_file)
+        self._pool = pool or ConnectionPool(self.config.get('idle_timeout', 100))
+    
+    def connect_imap(self):
+        """连接IMAP服务器
+        
+        Returns:
+            PipelinedIMAP4_SSL: 已登录的IMAP连接
+        """
+        try:
+            imap_conn = PipelinedIMAP4_SSL(
+                self.config['imap_server'], 
+                self.config.get('imap_port', 993)
+            )
+            imap_conn.login(self.config['email'], self.config['password'])
+            self.logger.info("IMAP连接成功")
+            return imap_conn
+            
+        except imaplib.IMAP4.abort as e:
+            raise Exception(f"NETWORK_ERROR: {str(e)}")
+        except imaplib.IMAP4.error as e:
+            if "authentication failed" in str(e).lower():
+                raise Exception(f"AUTHENTICATION_FAILED: {str(e)}")
+            else:
+                raise Exception(f"IMAP_CONNECTION_FAILED: {str(e)}")
+        except Exception as e:
+            raise Exception(f"NETWORK_ERROR: {str(e)}")
+    
+    def connect_smtp(self):
+        """连接SMTP服务器
+        
+        Returns:
+            smtplib.SMTP: 已登录的SMTP连接
+        """
+        try:
+            smtp_conn = smtplib.SMTP(
+                self.config['smtp_server'], 
+                self.config.get('smtp_port', 587)
+            )
+            smtp_conn.starttls()
+            smtp_conn.login(self.config['email'], self.config['password'])
+            self.logger.info("SMTP连接成功")
+            return smtp_conn
+            
+        except smtplib.SMTPAuthenticationError as e:
+            raise Exception(f"AUTHENTICATION_FAILED: {str(e)}")
+        except smtplib.SMTPException as e:
+            raise Exception(f"SMTP_CONNECTION_FAILED: {str(e)}")
+        except Exception as e:
+            raise Exception(f"NETWORK_ERROR: {str(e)}")
+    
+    def _pool_key(self, protocol):
+        """连接池中的连接标识
+        
+        Args:
+            protocol (str): 'imap' 或 'smtp'
+            
+        Returns:
+            tuple: (协议, 服务器, 端口, 用户)
+        """
+        if protocol == 'imap':
+            return ('imap', self.config['imap_server'],
+                    self.config.get('imap_port', 993), self.config['email'])
+        return ('smtp', self.config['smtp_server'],
+                self.config.get('smtp_port', 587), self.config['email'])
+    
+    @contextlib.contextmanager
+    def acquire_imap(self):
+        """从连接池借用IMAP连接
+        
+        复用前发送 NOOP 检查连接, 失效则丢弃并新建。使用过程中发生连接
+        层面的错误时丢弃这一个连接, 其他情况 (包括文件夹不存在等应用层
+        错误) 都放回连接池。
+        
+        Yields:
+            PipelinedIMAP4_SSL: 已登录的IMAP连接
+        """
+        key = self._pool_key('imap')
+        imap_conn = self._pool.get(key)
+        while imap_conn is not None and not _imap_alive(imap_conn):
+            _close_quietly(_logout_imap, imap_conn)
+            imap_conn = self._pool.get(key)
+        if imap_conn is None:
+            imap_conn = self.connect_imap()
+        
+        try:
+            yield imap_conn
+        except _IMAP_CONNECTION_ERRORS:
+            _close_quietly(_logout_imap, imap_conn)
+            raise
+        except Exception:
+            self.release_imap(imap_conn)
+            raise
+        self.release_imap(imap_conn)
+    
+    def release_imap(self, imap_conn):
+        """将IMAP连接放回连接池
+        
+        Args:
+            imap_conn (PipelinedIMAP4_SSL): IMAP连接
+        """
+        self._pool.put(self._pool_key('imap'), imap_conn, _logout_imap)
+    
+    @contextlib.contextmanager
+    def acquire_smtp(self):
+        """从连接池借用SMTP连接
+        
+        复用前发送 NOOP 检查连接, 失效则丢弃并新建。使用过程中发生连接
+        层面的错误时丢弃这一个连接, 其他情况 (包括文件夹不存在等应用层
+        错误) 都放回连接池。
+        
+        Yields:
+            smtplib.SMTP: 已登录的SMTP连接
+        """
+        key = self._pool_key('smtp')
+        smtp_conn = self._pool.get(key)
+        while smtp_conn is not None and not _smtp_alive(smtp_conn):
+            _close_quietly(_quit_smtp, smtp_conn)
+            smtp_conn = self._pool.get(key)
+        if smtp_conn is None:
+            smtp_conn = self.connect_smtp()
+        
+        try:
+            yield smtp_conn
+        except _SMTP_CONNECTION_ERRORS:
+            _close_quietly(_quit_smtp, smtp_conn)
+            raise
+        except Exception:
+            self.release_smtp(smtp_conn)
+            raise
+        self.release_smtp(smtp_conn)
+    
+    def release_smtp(self, smtp_conn):
+        """将SMTP连接放回连接池
+        
+        Args:
+            smtp_conn (smtplib.SMTP): SMTP连接
+        """
+        self._pool.put(self._pool_key('smtp'), smtp_conn, _quit_smtp)
+    
+    def keepalive(self):
+        """向连接池中的空闲连接发送 NOOP, 避免服务器因空闲而断开"""
+        self._pool.keepalive(self._pool_key('imap'), _imap_alive, _logout_imap)
+        self._pool.keepalive(self._pool_key('smtp'), _smtp_alive, _quit_smtp)
+    
+    def mail_read(self, folder="INBOX", limit=10):
+        """读取邮件
+        
+        Args:
+            folder (str): 邮件文件夹名称
+            limit (int): 读取邮件数量限制
+            
+        Returns:
+            dict: 包含邮件列表的结果
+        """
+        try:
+            return self._with_retry("读取邮件", self._read_pooled, folder, limit)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "emails": [],
+                "count": 0
+            }
+    
+    def _with_retry(self, action, fn, *args):
+        """执行操作, 失败时按指数退避重试
+        
+        每次重试前等待 retry_delay * 2^attempt 秒, 并乘以 0.5~1.5 的随机
+        系数, 避免多个客户端同时重试。只重试网络和连接层面的错误 (见
+        _is_retryable)。出错的连接已在借用时丢弃, 重试会使用新的连接。
+        
+        Args:
+            action (str): 操作名称, 用于日志
+            fn (callable): 要执行的操作
+            *args: 操作参数
+            
+        Returns:
+            操作的返回值
+            
+        Raises:
+            Exception: 最后一次尝试的错误
+        """
+        retry_count = self.config.get('retry_count', 3)
+        for attempt in range(retry_count):
+            try:
+                return fn(*args)
+            except Exception as e:
+                self.logger.error(f"{action}失败 (尝试 {attempt + 1}/{retry_count}): {str(e)}")
+                if attempt >= retry_count - 1 or not _is_retryable(e):
+                    raise
+                time.sleep(self._retry_delay(attempt))
+    
+    def _read_pooled(self, folder, limit):
+        """借用连接池中的IMAP连接读取邮件"""
+        with self.acquire_imap() as imap_conn:
+            return self._read_folder(imap_conn, folder, limit)
+    
+    def mail_read_multi(self, folders, limit=10):
+        """并发读取多个文件夹的邮件
+        
+        每个工作线程从连接池借用独立的 IMAP 连接, 线程数不超过配置项
+        max_imap_connections (默认 4)。
+        
+        Args:
+            folders (list): 邮件文件夹名称列表
+            limit (int): 每个文件夹读取邮件数量限制
+            
+        Returns:
+            dict: 按文件夹分组的邮件列表
+        """
+        folder_results = {}
+        if folders:
+            max_workers = min(len(folders), self.config.get('max_imap_connections', 4))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = executor.map(lambda folder: self.mail_read(folder, limit), folders)
+                folder_results = dict(zip(folders, results))
+        
+        return {
+            "success": all(r["success"] for r in folder_results.values()),
+            "folders": folder_results,
+            "count": sum(r["count"] for r in folder_results.values())
+        }
+    
+    def _read_folder(self, imap_conn, folder, limit):
+        """在给定连接上读取文件夹中最新的邮件
+        
+        Args:
+            imap_conn (PipelinedIMAP4_SSL): IMAP连接
+            folder (str): 邮件文件夹名称
+            limit (int): 读取邮件数量限制
+            
+        Returns:
+            dict: 包含邮件列表的结果
+        """
+        # 以只读方式选择文件夹, SELECT 响应中已包含邮件数量
+        status, messages = imap_conn.select_cached(folder, readonly=True)
+        if status != 'OK':
+            raise Exception(f"FOLDER_NOT_FOUND: 无法访问文件夹 {folder}")
+        uidvalidity = imap_conn.uidvalidity
+        
+        # 最新的 limit 封邮件的序号, 倒序即为从新到旧
+        count = int(messages[-1] or 0)
+        seqs = range(max(1, count - limit + 1), count + 1)
+        if not seqs:
+            return {
+                "success": True,
+                "emails": [],
+                "count": 0
+            }
+        
+        # 只取这些邮件的 UID, 不必 SEARCH ALL 传回整个文件夹的 ID
+        status, msg_data = imap_conn.fetch(f'{seqs[0]}:{seqs[-1]}', '(UID)')
+        if status != 'OK':
+            raise Exception("邮件搜索失败")
+        latest_ids = _uids_newest_first(msg_data, seqs)
+        
+        # 已缓存的邮件不再重复获取
+        known = self._cache_get(folder, uidvalidity, latest_ids)
+        missing_ids = [msg_id for msg_id in latest_ids if msg_id not in known]
+        
+        if missing_ids:
+            # 只获取邮件结构、列表需要的头部字段和正文开头, 不下载完整邮件
+            fetched = self._fetch_batched(imap_conn, missing_ids, _SUMMARY_FETCH_ITEMS)
+            
+            text_parts, requests = self._plan_text_parts(fetched)
+            if requests:
+                _merge_fetched(fetched, self._fetch_many(imap_conn, requests))
+            new_emails = self._build_email_list(missing_ids, fetched, text_parts)
+            
+            self._cache_put(folder, uidvalidity, new_emails)
+            known.update((e['id'].encode(), e) for e in new_emails)
+        
+        emails = [known[msg_id] for msg_id in latest_ids if msg_id in known]
+        
+        return {
+            "success": True,
+            "emails": emails,
+            "count": len(emails)
+        }
+    
+    def _fetch_batched(self, imap_conn, message_ids, message_parts):
+        """分批获取邮件数据, 各批 UID FETCH 以流水线方式发送
+        
+        Args:
+            imap_conn (PipelinedIMAP4_SSL): IMAP连接
+            message_ids (list): UID 列表 (bytes)
+            message_parts (str): FETCH 数据项
+            
+        Returns:
+            dict: UID -> {数据项名称: 数据}
+        """
+        return self._fetch_many(imap_conn, [(message_ids, message_parts)])
+    
+    def _fetch_many(self, imap_conn, requests):
+        """分批获取多组邮件数据, 全部 UID FETCH 以流水线方式发送
+        
+        Args:
+            imap_conn (PipelinedIMAP4_SSL): IMAP连接
+            requests (list): [(UID 列表, FETCH 数据项), ...]
+            
+        Returns:
+            dict: UID -> {数据项名称: 数据}
+        """
+        batch_size = self.config.get('fetch_batch_size', 100)
+        commands = [
+            (_compact_message_set(message_ids[start:start + batch_size]), message_parts)
+            for message_ids, message_parts in requests
+            for start in range(0, len(message_ids), batch_size)
+        ]
+        statuses, msg_data = imap_conn.fetch_pipelined(commands, uid=True)
+        for status in statuses:
+            if status != 'OK':
+                self.logger.warning(f"批量获取邮件失败: {status}")
+        return _parse_fetch_response(msg_data, by_uid=True)
+    
+    def mail_send(self, to, subject, body):
+        """发送邮件
+        
+        Args:
+            to (str): 收件人邮箱
+            subject (str): 邮件主题
+            body (str): 邮件正文
+            
+        Returns:
+            dict: 发送结果
+        """
+        # 验证邮箱格式
+        if not self._is_valid_email(to):
+            return {
+                "success": False,
+                "error": "INVALID_EMAIL_FORMAT: 收件人邮箱格式无效"
+            }
+        
+        try:
+            # 创建邮件
+            msg = self._build_message(to, subject, body)
+            
+            # 发送邮件, 直接按字节序列化消息对象; 信封收件人只用校验过的地址
+            self._with_retry("发送邮件", self._send_pooled, msg, parseaddr(to)[1])
+            
+            return {
+                "success": True,
+                "message": f"Email sent to {to}",
+                "timestamp": datetime.datetime.now().isoformat()
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "timestamp": datetime.datetime.now().isoformat()
+            }
+    
+    def _send_pooled(self, msg, recipient):
+        """借用连接池中的SMTP连接发送邮件"""
+        with self.acquire_smtp() as smtp_conn:
+            smtp_conn.send_message(msg, to_addrs=[recipient])
+    
+    def mail_get(self, email_id):
+        """获取邮件详细内容
+        
+        Args:
+            email_id (str): 邮件ID
+            
+        Returns:
+            dict: 邮件详细信息
+        """
+        try:
+            email_body = self._with_retry("获取邮件详情", self._get_pooled, email_id)
+            return self._build_email_detail(email_id, email_body)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def _get_pooled(self, email_id):
+        """借用连接池中的IMAP连接获取完整邮件
+        
+        Args:
+            email_id (str): 邮件ID (UID)
+            
+        Returns:
+            bytes: RFC822 邮件内容
+        """
+        with self.acquire_imap() as imap_conn:
+            # 选择收件箱 (读写方式, 获取后邮件会被标记为已读)
+            imap_conn.select_cached('INBOX')
+            
+            # 获取邮件 (邮件ID为 UID)
+            status, msg_data = imap_conn.uid('FETCH', email_id, '(RFC822)')
+        sections = _parse_fetch_response(msg_data, by_uid=True).get(email_id.encode())
+        if status != 'OK' or not sections or b'RFC822' not in sections:
+            raise Exception(f"EMAIL_NOT_FOUND: 邮件ID {email_id} 不存在")
+        return sections[b'RFC822']
+    
+    def close_connections(self):
+        """关闭所有连接"""
+        try:
+            self._pool.close_all()
+            self._close_header_cache()
+            self.logger.info("所有连接已关闭")
+        except Exception as e:
+            self.logger.warning(f"关闭连接时出错: {str(e)}")
+
+
+class AsyncMCPMailTool(_MailToolBase):
+    """基于 asyncio 的邮件工具
+    
+    使用 aioimaplib/aiosmtplib 原生异步连接, 网络等待可以相互重叠。
+    配置、缓存和邮件解析逻辑与 MCPMailTool 共用 (_MailToolBase), 不继承
+    其同步连接管理; mail_read/mail_send/mail_get 等方法均为协程。
+    """
+    
+    def __init__(self, config_file="config.json"):
+        """初始化异步邮件工具
+        
+        Args:
+            config_file (str): 配置文件路径
+            
+        Raises:
+            Exception: 未安装 aioimaplib/aiosmtplib
+        """
+        if aioimaplib is None or aiosmtplib is None:
+            raise Exception("CONFIGURATION_ERROR: 异步接口需要安装 aioimaplib 和 aiosmtplib")
+        super().__init__(config_file)
+        self.imap_conn = None
+        self.smtp_conn = None
     
-    def connect_imap(self):
+    async def connect_imap(self):
         """连接IMAP服务器
         
         Returns:
-            bool: 连接是否成功
+            aioimaplib.IMAP4_SSL: 已登录的IMAP连接
         """
         try:
-            self.imap_conn = imaplib.IMAP4_SSL(
-                self.config['imap_server'], 
-                self.config.get('imap_port', 993)
+            imap_conn = aioimaplib.IMAP4_SSL(
+                host=self.config['imap_server'],
+                port=self.config.get('imap_port', 993)
             )
-            self.imap_conn.login(self.config['email'], self.config['password'])
-            self.logger.info("IMAP连接成功")
-            return True
-            
-        except imaplib.IMAP4.error as e:
-            if "authentication failed" in str(e).lower():
-                raise Exception(f"AUTHENTICATION_FAILED: {str(e)}")
-            else:
-                raise Exception(f"IMAP_CONNECTION_FAILED: {str(e)}")
+            await imap_conn.wait_hello_from_server()
+            response = await imap_conn.login(self.config['email'], self.config['password'])
         except Exception as e:
             raise Exception(f"NETWORK_ERROR: {str(e)}")
+        
+        if response.result != 'OK':
+            message = b' '.join(bytes(line) for line in response.lines).decode(errors='ignore')
+            if "authentication failed" in message.lower():
+                raise Exception(f"AUTHENTICATION_FAILED: {message}")
+            raise Exception(f"IMAP_CONNECTION_FAILED: {message}")
+        
+        self.logger.info("IMAP连接成功")
+        return imap_conn
     
-    def connect_smtp(self):
+    async def connect_smtp(self):
         """连接SMTP服务器
         
         Returns:
-            bool: 连接是否成功
+            aiosmtplib.SMTP: 已登录的SMTP连接
         """
         try:
-            self.smtp_conn = smtplib.SMTP(
-                self.config['smtp_server'], 
-                self.config.get('smtp_port', 587)
+            smtp_conn = aiosmtplib.SMTP(
+                hostname=self.config['smtp_server'],
+                port=self.config.get('smtp_port', 587),
+                start_tls=True
             )
-            self.smtp_conn.starttls()
-            self.smtp_conn.login(self.config['email'], self.config['password'])
+            await smtp_conn.connect()
+            await smtp_conn.login(self.config['email'], self.config['password'])
             self.logger.info("SMTP连接成功")
-            return True
+            return smtp_conn
             
-        except smtplib.SMTPAuthenticationError as e:
+        except aiosmtplib.SMTPAuthenticationError as e:
             raise Exception(f"AUTHENTICATION_FAILED: {str(e)}")
-        except smtplib.SMTPException as e:
+        except aiosmtplib.SMTPException as e:
             raise Exception(f"SMTP_CONNECTION_FAILED: {str(e)}")
         except Exception as e:
             raise Exception(f"NETWORK_ERROR: {str(e)}")
     
-    def decode_mime_words(self, s):
-        """解码MIME编码的字符串
+    async def mail_read(self, folder="INBOX", limit=10):
+        """读取邮件
         
         Args:
-            s (str): 待解码字符串
+            folder (str): 邮件文件夹名称
+            limit (int): 读取邮件数量限制
             
         Returns:
-            str: 解码后的字符串
+            dict: 包含邮件列表的结果
         """
         try:
-            decoded_fragments = decode_header(s)
-            decoded_string = ''
-            
-            for fragment, encoding in decoded_fragments:
-                if isinstance(fragment, bytes):
-                    if encoding:
-                        decoded_string += fragment.decode(encoding)
-                    else:
-                        decoded_string += fragment.decode('utf-8', errors='ignore')
-                else:
-                    decoded_string += fragment
-                    
-            return decoded_string
+            return await self._with_retry("读取邮件", self._reset_imap, self._read_once, folder, limit)
         except Exception as e:
-            self.logger.warning(f"解码失败: {str(e)}")
-            return str(s)
+            return {
+                "success": False,
+                "error": str(e),
+                "emails": [],
+                "count": 0
+            }
     
-    def mail_read(self, folder="INBOX", limit=10):
-        """读取邮件
+    async def _with_retry(self, action, reset, fn, *args):
+        """执行操作, 失败时按指数退避重试
+        
+        与 MCPMailTool._with_retry 相同, 只重试网络和连接层面的错误;
+        每次重试前调用 reset 丢弃出错的连接。
         
         Args:
-            folder (str): 邮件文件夹名称
-            limit (int): 读取邮件数量限制
+            action (str): 操作名称, 用于日志
+            reset (callable): 丢弃连接的协程函数
+            fn (callable): 要执行的协程函数
+            *args: 操作参数
             
         Returns:
-            dict: 包含邮件列表的结果
+            操作的返回值
+            
+        Raises:
+            Exception: 最后一次尝试的错误
         """
         retry_count = self.config.get('retry_count', 3)
-        retry_delay = self.config.get('retry_delay', 2)
-        
         for attempt in range(retry_count):
             try:
-                if not self.imap_conn:
-                    self.connect_imap()
-                
-                # 选择文件夹
-                status, messages = self.imap_conn.select(folder)
-                if status != 'OK':
-                    raise Exception(f"FOLDER_NOT_FOUND: 无法访问文件夹 {folder}")
-                
-                # 搜索邮件
-                status, messages = self.imap_conn.search(None, 'ALL')
-                if status != 'OK':
-                    raise Exception("邮件搜索失败")
-                
-                message_ids = messages[0].split()
-                if not message_ids:
-                    return {
-                        "success": True,
-                        "emails": [],
-                        "count": 0
-                    }
-                
-                # 获取最新的邮件（倒序）
-                latest_ids = message_ids[-limit:] if len(message_ids) >= limit else message_ids
-                latest_ids.reverse()
-                
-                emails = []
-                for msg_id in latest_ids:
-                    try:
-                        status, msg_data = self.imap_conn.fetch(msg_id, '(RFC822)')
-                        if status != 'OK':
-                            continue
-                            
-                        email_body = msg_data[0][1]
-                        email_message = email.message_from_bytes(email_body)
-                        
-                        # 提取邮件信息
-                        subject = self.decode_mime_words(email_message['Subject'] or "无主题")
-                        sender = self.decode_mime_words(email_message['From'] or "未知发件人")
-                        date = email_message['Date'] or "未知时间"
-                        
-                        # 提取邮件正文摘要
-                        body_summary = self.extract_body_summary(email_message)
-                        
-                        emails.append({
-                            "id": msg_id.decode(),
-                            "subject": subject,
-                            "sender": sender,
-                            "date": date,
-                            "body_summary": body_summary
-                        })
-                        
-                    except Exception as e:
-                        self.logger.warning(f"处理邮件 {msg_id} 时出错: {str(e)}")
-                        continue
-                
-                return {
-                    "success": True,
-                    "emails": emails,
-                    "count": len(emails)
-                }
-                
+                return await fn(*args)
             except Exception as e:
-                self.logger.error(f"读取邮件失败 (尝试 {attempt + 1}/{retry_count}): {str(e)}")
-                if attempt < retry_count - 1:
-                    time.sleep(retry_delay)
-                    self.imap_conn = None  # 重置连接
-                else:
-                    return {
-                        "success": False,
-                        "error": str(e),
-                        "emails": [],
-                        "count": 0
-                    }
+                self.logger.error(f"{action}失败 (尝试 {attempt + 1}/{retry_count}): {str(e)}")
+                if attempt >= retry_count - 1 or not _is_retryable(e):
+                    raise
+                await reset()
+                await asyncio.sleep(self._retry_delay(attempt))
     
-    def extract_body_summary(self, email_message, max_length=200):
-        """提取邮件正文摘要
+    async def _read_once(self, folder, limit):
+        """在当前连接上读取文件夹中最新的邮件, 没有连接时新建
         
         Args:
-            email_message: 邮件消息对象
-            max_length (int): 摘要最大长度
+            folder (str): 邮件文件夹名称
+            limit (int): 读取邮件数量限制
             
         Returns:
-            str: 邮件正文摘要
+            dict: 包含邮件列表的结果
         """
-        try:
-            body = ""
+        if not self.imap_conn:
+            self.imap_conn = await self.connect_imap()
+        
+        # 选择文件夹
+        response = await self.imap_conn.select(folder)
+        if response.result != 'OK':
+            raise Exception(f"FOLDER_NOT_FOUND: 无法访问文件夹 {folder}")
+        uidvalidity = None
+        count = 0
+        for line in response.lines:
+            match = _UIDVALIDITY_RE.search(bytes(line))
+            if match:
+                uidvalidity = match.group(1)
+            match = _EXISTS_RE.match(bytes(line))
+            if match:
+                count = int(match.group(1))
+        
+        # 最新的 limit 封邮件的序号, 倒序即为从新到旧
+        seqs = range(max(1, count - limit + 1), count + 1)
+        if not seqs:
+            return {
+                "success": True,
+                "emails": [],
+                "count": 0
+            }
+        
+        # 只取这些邮件的 UID
+        response = await self.imap_conn.fetch(f'{seqs[0]}:{seqs[-1]}', '(UID)')
+        if response.result != 'OK':
+            raise Exception("邮件搜索失败")
+        latest_ids = _uids_newest_first(_aioimaplib_to_imaplib(response.lines), seqs)
+        
+        # 已缓存的邮件不再重复获取
+        known = self._cache_get(folder, uidvalidity, latest_ids)
+        missing_ids = [msg_id for msg_id in latest_ids if msg_id not in known]
+        
+        if missing_ids:
+            fetched = await self._fetch_batched(self.imap_conn, missing_ids, _SUMMARY_FETCH_ITEMS)
+            text_parts, requests = self._plan_text_parts(fetched)
+            if requests:
+                _merge_fetched(fetched, await self._fetch_many(self.imap_conn, requests))
+            new_emails = self._build_email_list(missing_ids, fetched, text_parts)
             
-            if email_message.is_multipart():
-                for part in email_message.walk():
-                    if part.get_content_type() == "text/plain":
-                        charset = part.get_content_charset() or 'utf-8'
-                        body = part.get_payload(decode=True).decode(charset, errors='ignore')
-                        break
-            else:
-                charset = email_message.get_content_charset() or 'utf-8'
-                body = email_message.get_payload(decode=True).decode(charset, errors='ignore')
+            self._cache_put(folder, uidvalidity, new_emails)
+            known.update((e['id'].encode(), e) for e in new_emails)
+        
+        emails = [known[msg_id] for msg_id in latest_ids if msg_id in known]
+        
+        return {
+            "success": True,
+            "emails": emails,
+            "count": len(emails)
+        }
+    
+    async def _fetch_batched(self, imap_conn, message_ids, message_parts):
+        """分批获取邮件数据
+        
+        Args:
+            imap_conn (aioimaplib.IMAP4_SSL): IMAP连接
+            message_ids (list): UID 列表 (bytes)
+            message_parts (str): FETCH 数据项
             
-            # 清理和截断正文
-            body = body.strip().replace('\n', ' ').replace('\r', ' ')
-            if len(body) > max_length:
-                body = body[:max_length] + "..."
-                
-            return body or "无正文内容"
+        Returns:
+            dict: UID -> {数据项名称: 数据}
+        """
+        return await self._fetch_many(imap_conn, [(message_ids, message_parts)])
+    
+    async def _fetch_many(self, imap_conn, requests):
+        """分批获取多组邮件数据
+        
+        aioimaplib 在同一连接上会串行执行同类命令, 因此各批依次等待;
+        需要并发时使用多个连接 (见 mail_read_multi)。
+        
+        Args:
+            imap_conn (aioimaplib.IMAP4_SSL): IMAP连接
+            requests (list): [(UID 列表, FETCH 数据项), ...]
             
-        except Exception as e:
-            self.logger.warning(f"提取正文摘要失败: {str(e)}")
-            return "正文解析失败"
+        Returns:
+            dict: UID -> {数据项名称: 数据}
+        """
+        batch_size = self.config.get('fetch_batch_size', 100)
+        fetched = {}
+        for message_ids, message_parts in requests:
+            for start in range(0, len(message_ids), batch_size):
+                batch = message_ids[start:start + batch_size]
+                response = await imap_conn.uid(
+                    'fetch', _compact_message_set(batch).decode(), message_parts
+                )
+                if response.result != 'OK':
+                    self.logger.warning(f"批量获取邮件失败: {response.result}")
+                    continue
+                msg_data = _aioimaplib_to_imaplib(response.lines)
+                _merge_fetched(fetched, _parse_fetch_response(msg_data, by_uid=True))
+        return fetched
     
-    def mail_send(self, to, subject, body):
+    async def mail_read_multi(self, folders, limit=10):
+        """并发读取多个文件夹的邮件
+        
+        每个文件夹使用独立的 IMAP 连接, 各文件夹的读取同时进行。
+        
+        Args:
+            folders (list): 邮件文件夹名称列表
+            limit (int): 每个文件夹读取邮件数量限制
+            
+        Returns:
+            dict: 按文件夹分组的邮件列表
+        """
+        # 各连接共用同一个邮件列表缓存, 在并发读取前打开
+        self._header_cache()
+        results = await asyncio.gather(
+            *[self._read_on_new_connection(folder, limit) for folder in folders],
+            return_exceptions=True
+        )
+        
+        folder_results = {}
+        for folder, result in zip(folders, results):
+            if isinstance(result, Exception):
+                result = {"success": False, "error": str(result), "emails": [], "count": 0}
+            folder_results[folder] = result
+        
+        return {
+            "success": all(r["success"] for r in folder_results.values()),
+            "folders": folder_results,
+            "count": sum(r["count"] for r in folder_results.values())
+        }
+    
+    async def _read_on_new_connection(self, folder, limit):
+        """使用独立连接读取单个文件夹
+        
+        Args:
+            folder (str): 邮件文件夹名称
+            limit (int): 读取邮件数量限制
+            
+        Returns:
+            dict: 包含邮件列表的结果
+        """
+        worker = copy.copy(self)
+        worker.imap_conn = None
+        worker.smtp_conn = None
+        try:
+            return await worker.mail_read(folder, limit)
+        finally:
+            # 只关闭自己的连接, 缓存仍由原对象持有; 关闭失败不影响已读到的结果
+            await worker._reset_imap()
+    
+    async def mail_send(self, to, subject, body):
         """发送邮件
         
         Args:
@@ -280,53 +1826,38 @@ class MCPMailTool:
         Returns:
             dict: 发送结果
         """
-        retry_count = self.config.get('retry_count', 3)
-        retry_delay = self.config.get('retry_delay', 2)
-        
         # 验证邮箱格式
-        if '@' not in to or '.' not in to.split('@')[1]:
+        if not self._is_valid_email(to):
             return {
                 "success": False,
                 "error": "INVALID_EMAIL_FORMAT: 收件人邮箱格式无效"
             }
         
-        for attempt in range(retry_count):
-            try:
-                if not self.smtp_conn:
-                    self.connect_smtp()
-                
-                # 创建邮件
-                msg = MIMEMultipart()
-                msg['From'] = self.config['email']
-                msg['To'] = to
-                msg['Subject'] = subject
-                
-                # 添加正文
-                msg.attach(MIMEText(body, 'plain', 'utf-8'))
-                
-                # 发送邮件
-                text = msg.as_string()
-                self.smtp_conn.sendmail(self.config['email'], to, text)
-                
-                return {
-                    "success": True,
-                    "message": f"Email sent to {to}",
-                    "timestamp": datetime.datetime.now().isoformat()
-                }
-                
-            except Exception as e:
-                self.logger.error(f"发送邮件失败 (尝试 {attempt + 1}/{retry_count}): {str(e)}")
-                if attempt < retry_count - 1:
-                    time.sleep(retry_delay)
-                    self.smtp_conn = None  # 重置连接
-                else:
-                    return {
-                        "success": False,
-                        "error": str(e),
-                        "timestamp": datetime.datetime.now().isoformat()
-                    }
+        try:
+            msg = self._build_message(to, subject, body)
+            await self._with_retry("发送邮件", self._reset_smtp, self._send_once,
+                                   msg, parseaddr(to)[1])
+            
+            return {
+                "success": True,
+                "message": f"Email sent to {to}",
+                "timestamp": datetime.datetime.now().isoformat()
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "timestamp": datetime.datetime.now().isoformat()
+            }
     
-    def mail_get(self, email_id):
+    async def _send_once(self, msg, recipient):
+        """在当前连接上发送邮件, 没有连接时新建"""
+        if not self.smtp_conn:
+            self.smtp_conn = await self.connect_smtp()
+        await self.smtp_conn.send_message(msg, recipients=[recipient])
+    
+    async def mail_get(self, email_id):
         """获取邮件详细内容
         
         Args:
@@ -335,105 +1866,236 @@ class MCPMailTool:
         Returns:
             dict: 邮件详细信息
         """
-        retry_count = self.config.get('retry_count', 3)
-        retry_delay = self.config.get('retry_delay', 2)
+        try:
+            email_body = await self._with_retry("获取邮件详情", self._reset_imap, self._get_once, email_id)
+            return self._build_email_detail(email_id, email_body)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    async def _get_once(self, email_id):
+        """在当前连接上获取完整邮件, 没有连接时新建
         
-        for attempt in range(retry_count):
+        Args:
+            email_id (str): 邮件ID (UID)
+            
+        Returns:
+            bytes: RFC822 邮件内容
+        """
+        if not self.imap_conn:
+            self.imap_conn = await self.connect_imap()
+        
+        # 选择收件箱
+        await self.imap_conn.select('INBOX')
+        
+        # 获取邮件 (邮件ID为 UID)
+        response = await self.imap_conn.uid('fetch', email_id, '(RFC822)')
+        msg_data = _aioimaplib_to_imaplib(response.lines)
+        sections = _parse_fetch_response(msg_data, by_uid=True).get(email_id.encode())
+        if response.result != 'OK' or not sections or b'RFC822' not in sections:
+            raise Exception(f"EMAIL_NOT_FOUND: 邮件ID {email_id} 不存在")
+        return sections[b'RFC822']
+    
+    async def close_connections(self):
+        """关闭所有连接和邮件列表缓存"""
+        try:
+            await self._close_imap()
+            await self._close_smtp()
+            
+            self._close_header_cache()
+            self.logger.info("所有连接已关闭")
+        except Exception as e:
+            self.logger.warning(f"关闭连接时出错: {str(e)}")
+    
+    async def _close_imap(self):
+        """注销并丢弃IMAP连接"""
+        if self.imap_conn:
+            imap_conn, self.imap_conn = self.imap_conn, None
+            await imap_conn.logout()
+    
+    async def _close_smtp(self):
+        """退出并丢弃SMTP连接"""
+        if self.smtp_conn:
+            smtp_conn, self.smtp_conn = self.smtp_conn, None
+            await smtp_conn.quit()
+    
+    async def _reset_imap(self):
+        """丢弃出错的IMAP连接, 下次使用时重新连接"""
+        try:
+            await asyncio.wait_for(self._close_imap(), timeout=5)
+        except Exception:
+            pass
+    
+    async def _reset_smtp(self):
+        """丢弃出错的SMTP连接, 下次使用时重新连接"""
+        try:
+            await asyncio.wait_for(self._close_smtp(), timeout=5)
+        except Exception:
+            pass
+
+
+class MCPMailServer:
+    """基于标准输入输出的 MCP 服务器
+    
+    长期运行并持有同一个 MCPMailTool, 多次请求共用已登录的连接,
+    只需为实际的 IMAP/SMTP 命令付出时间。请求为按行分隔的
+    JSON-RPC 2.0 消息, 日志输出到标准错误。
+    """
+    
+    # 允许通过 tools/call 调用的工具方法
+    TOOL_NAMES = ('mail_read', 'mail_read_multi', 'mail_send', 'mail_get')
+    
+    def __init__(self, tool, manifest_file=None):
+        """初始化服务器
+        
+        Args:
+            tool (MCPMailTool): 邮件工具实例
+            manifest_file (str): MCP 接口定义文件, 默认为同目录下的 mail.mcp.json
+        """
+        self.tool = tool
+        self.logger = tool.logger
+        manifest_file = manifest_file or os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'mail.mcp.json'
+        )
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.name = manifest.get('name', 'mcp_mail')
+        self.version = manifest.get('version', '1.0.0')
+        self.tools = [
+            {
+                "name": spec['name'],
+                "description": spec.get('description', ''),
+                "inputSchema": spec.get('inputSchema', {"type": "object"})
+            }
+            for spec in manifest['capabilities']['tools']
+            if spec['name'] in self.TOOL_NAMES
+        ]
+        # 邮件操作和心跳都在同一个工作线程中执行, 保证连接不会被并发使用;
+        # mail_read_multi 的各个线程从连接池借用各自的连接
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    
+    async def serve(self, heartbeat_interval=120):
+        """处理标准输入上的请求, 直到输入结束
+        
+        Args:
+            heartbeat_interval (float): 空闲连接心跳间隔 (秒)
+        """
+        loop = asyncio.get_running_loop()
+        heartbeat = asyncio.create_task(self._noop_loop(heartbeat_interval))
+        self.logger.info("MCP 服务器已启动")
+        try:
+            while True:
+                line = await loop.run_in_executor(None, sys.stdin.readline)
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    response = await self.handle_message(line)
+                except Exception as e:
+                    # 单个请求出错不应终止服务器
+                    self.logger.error(f"处理请求失败: {str(e)}")
+                    response = self._error(None, -32603, f"Internal error: {str(e)}")
+                if response is not None:
+                    sys.stdout.write(json.dumps(response, ensure_ascii=False) + "\n")
+                    sys.stdout.flush()
+        finally:
+            heartbeat.cancel()
+            await loop.run_in_executor(self._executor, self.tool.close_connections)
+            self._executor.shutdown()
+    
+    async def _noop_loop(self, interval=120):
+        """定期向空闲连接发送 NOOP, 保持会话不被服务器超时断开
+        
+        Args:
+            interval (float): 心跳间隔 (秒)
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
             try:
-                if not self.imap_conn:
-                    self.connect_imap()
-                
-                # 选择收件箱
-                self.imap_conn.select('INBOX')
-                
-                # 获取邮件
-                status, msg_data = self.imap_conn.fetch(email_id.encode(), '(RFC822)')
-                if status != 'OK':
-                    raise Exception(f"EMAIL_NOT_FOUND: 邮件ID {email_id} 不存在")
-                
-                email_body = msg_data[0][1]
-                email_message = email.message_from_bytes(email_body)
-                
-                # 提取完整邮件信息
-                subject = self.decode_mime_words(email_message['Subject'] or "无主题")
-                sender = self.decode_mime_words(email_message['From'] or "未知发件人")
-                to = self.decode_mime_words(email_message['To'] or "未知收件人")
-                date = email_message['Date'] or "未知时间"
-                
-                # 提取完整正文
-                body = self.extract_full_body(email_message)
-                
-                return {
-                    "success": True,
-                    "id": email_id,
-                    "subject": subject,
-                    "sender": sender,
-                    "to": to,
-                    "date": date,
-                    "body": body
-                }
-                
+                await loop.run_in_executor(self._executor, self.tool.keepalive)
             except Exception as e:
-                self.logger.error(f"获取邮件详情失败 (尝试 {attempt + 1}/{retry_count}): {str(e)}")
-                if attempt < retry_count - 1:
-                    time.sleep(retry_delay)
-                    self.imap_conn = None  # 重置连接
-                else:
-                    return {
-                        "success": False,
-                        "error": str(e)
-                    }
+                self.logger.warning(f"连接心跳失败: {str(e)}")
     
-    def extract_full_body(self, email_message):
-        """提取邮件完整正文
+    async def handle_message(self, line):
+        """处理一条 JSON-RPC 消息
         
         Args:
-            email_message: 邮件消息对象
+            line (str): JSON-RPC 请求
             
         Returns:
-            str: 邮件完整正文
+            dict: JSON-RPC 响应, 通知消息返回 None
         """
         try:
-            body = ""
-            
-            if email_message.is_multipart():
-                for part in email_message.walk():
-                    if part.get_content_type() == "text/plain":
-                        charset = part.get_content_charset() or 'utf-8'
-                        body = part.get_payload(decode=True).decode(charset, errors='ignore')
-                        break
-                    elif part.get_content_type() == "text/html" and not body:
-                        # 如果没有纯文本，使用HTML（简单处理）
-                        charset = part.get_content_charset() or 'utf-8'
-                        html_body = part.get_payload(decode=True).decode(charset, errors='ignore')
-                        # 简单的HTML标签移除
-                        import re
-                        body = re.sub(r'<[^>]+>', '', html_body)
-            else:
-                charset = email_message.get_content_charset() or 'utf-8'
-                body = email_message.get_payload(decode=True).decode(charset, errors='ignore')
-            
-            return body.strip() or "无正文内容"
+            request = json.loads(line)
+        except ValueError as e:
+            return self._error(None, -32700, f"Parse error: {str(e)}")
+        
+        # 不支持批量请求, 数组和其他非对象值均视为无效请求
+        if not isinstance(request, dict):
+            return self._error(None, -32600, "Invalid Request: expected a JSON object")
+        
+        request_id = request.get('id')
+        method = request.get('method')
+        params = request.get('params') or {}
+        if not isinstance(params, dict):
+            return self._error(request_id, -32602, "Invalid params: expected an object")
+        
+        if method == 'initialize':
+            result = {
+                "protocolVersion": params.get('protocolVersion', '2024-11-05'),
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": self.name, "version": self.version}
+            }
+        elif method == 'ping':
+            result = {}
+        elif method == 'tools/list':
+            result = {"tools": self.tools}
+        elif method == 'tools/call':
+            name = params.get('name')
+            if name not in self.TOOL_NAMES:
+                return self._error(request_id, -32602, f"Unknown tool: {name}")
+            arguments = params.get('arguments') or {}
+            if not isinstance(arguments, dict):
+                return self._error(request_id, -32602, "Invalid arguments: expected an object")
+            try:
+                result = await self._call_tool(name, arguments)
+            except TypeError as e:
+                return self._error(request_id, -32602, f"Invalid arguments: {str(e)}")
+        elif request_id is None:
+            # 通知消息 (如 notifications/initialized) 不需要响应
+            return None
+        else:
+            return self._error(request_id, -32601, f"Method not found: {method}")
+        
+        if request_id is None:
+            return None
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+    
+    async def _call_tool(self, name, arguments):
+        """在工作线程中调用邮件工具方法
+        
+        Args:
+            name (str): 工具名称
+            arguments (dict): 工具参数
             
-        except Exception as e:
-            self.logger.warning(f"提取完整正文失败: {str(e)}")
-            return "正文解析失败"
+        Returns:
+            dict: MCP 工具调用结果
+        """
+        loop = asyncio.get_running_loop()
+        method = getattr(self.tool, name)
+        result = await loop.run_in_executor(self._executor, lambda: method(**arguments))
+        return {
+            "content": [{"type": "text", "text": json.dumps(result, ensure_ascii=False)}],
+            "isError": not result.get('success', False)
+        }
     
-    def close_connections(self):
-        """关闭所有连接"""
-        try:
-            if self.imap_conn:
-                self.imap_conn.close()
-                self.imap_conn.logout()
-                self.imap_conn = None
-                
-            if self.smtp_conn:
-                self.smtp_conn.quit()
-                self.smtp_conn = None
-                
-            self.logger.info("所有连接已关闭")
-        except Exception as e:
-            self.logger.warning(f"关闭连接时出错: {str(e)}")
+    def _error(self, request_id, code, message):
+        """构造 JSON-RPC 错误响应"""
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
 
 
 def main():
@@ -443,10 +2105,21 @@ def main():
         print("  python mcp_mail.py read [folder] [limit]")
         print("  python mcp_mail.py send <to> <subject> <body>")
         print("  python mcp_mail.py get <email_id>")
+        print("  python mcp_mail.py serve")
         return
     
     command = sys.argv[1]
     
+    if command == "serve":
+        # 服务器模式: 连接由心跳保活, 不按空闲时间关闭
+        try:
+            tool = MCPMailTool(pool=ConnectionPool(idle_timeout=None))
+        except Exception as e:
+            print(f"错误: {str(e)}", file=sys.stderr)
+            return
+        asyncio.run(MCPMailServer(tool).serve())
+        return
+    
     try:
         tool = MCPMailTool()
         